@@ -0,0 +1,19 @@
+"""
+Builds the optional compiled ELO kernel (utils/_elo_cfast.pyx).
+
+    pip install cython
+    python setup.py build_ext --inplace
+
+utils.elo_model falls back to numba / plain Python when it is not built.
+"""
+
+from setuptools import setup, Extension
+from Cython.Build import cythonize
+
+setup(
+    name='csvy-python-utils',
+    ext_modules=cythonize(
+        [Extension('utils._elo_cfast', ['utils/_elo_cfast.pyx'])],
+        language_level=3,
+    ),
+)
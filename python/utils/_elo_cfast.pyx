@@ -0,0 +1,41 @@
+# cython: language_level=3
+"""
+Compiled ELO rating update, used by utils.elo_model when built.
+
+Build in place from the python/ folder:
+
+    python setup.py build_ext --inplace
+"""
+
+cimport cython
+from libc.math cimport exp, log
+
+# Team codes are int16, or int32 for very large leagues (see EloModel._team_codes)
+ctypedef fused index_t:
+    short
+    int
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef void run_elo(double[::1] ratings, const index_t[::1] home_idx, const index_t[::1] away_idx,
+                   const double[::1] home_adj_add, const double[::1] away_adj_add,
+                   const double[::1] mov_mult, const double[::1] home_actual, double k_factor,
+                   double[::1] out_home_rating, double[::1] out_away_rating) noexcept:
+    """Same contract as utils.elo_model._run_elo."""
+    cdef Py_ssize_t i, h, a
+    cdef double home_elo, away_elo, expected, delta
+    cdef double ln10_400 = log(10.0) / 400.0
+
+    for i in range(home_idx.shape[0]):
+        h = home_idx[i]
+        a = away_idx[i]
+        home_elo = ratings[h] + home_adj_add[i]
+        away_elo = ratings[a] + away_adj_add[i]
+        expected = 1.0 / (1.0 + exp(ln10_400 * (away_elo - home_elo)))
+        delta = k_factor * mov_mult[i] * (home_actual[i] - expected)
+        ratings[h] += delta
+        ratings[a] -= delta
+        out_home_rating[i] = ratings[h]
+        out_away_rating[i] = ratings[a]
@@ -1,13 +1,33 @@
+"""
+Chi-square test of independence for contingency tables.
+"""
+
 import numpy as np
-from scipy.stats import chi2_contingency
 
-# Your observed data (counts)
-observed = np.array([
-    [10, 20],
-    [30, 40]
-])
 
-chi2, p, dof, expected = chi2_codfasDfasdfsntingency(observed)
+def chi_square_test(observed):
+    """
+    Run a chi-square test of independence on a table of observed counts.
+
+    Returns (chi2, p, dof, expected) as produced by scipy.
+    """
+    from scipy.stats import chi2_contingency
+
+    return chi2_contingency(np.asarray(observed))
+
+
+def _demo():
+    # Your observed data (counts)
+    observed = np.array([
+        [10, 20],
+        [30, 40]
+    ])
+
+    chi2, p, dof, expected = chi_square_test(observed)
+
+    print("Chi-square:", chi2)
+    print("p-value:", p)
+
 
-print("Chi-square:", chi2)
-print("p-value:", p)
+if __name__ == "__main__":
+    _demo()
@@ -0,0 +1,586 @@
+"""
+ELO Rating System for Hockey Game Prediction.
+
+Reusable version of the EloModel class defined in the notebooks:
+
+    from utils.elo_model import EloModel
+"""
+
+import math
+from array import array
+
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+try:
+    from ._elo_cfast import run_elo as _run_elo_cfast
+except ImportError:  # compiled kernel not built; see python/setup.py
+    _run_elo_cfast = None
+
+# 10 ** (x / 400) == exp(x * ln(10) / 400); exp is cheaper than pow
+_LN10_400 = math.log(10) / 400
+
+# Margin-of-victory formula, chosen once per model (see _refresh_params)
+_MOV_OFF, _MOV_LINEAR, _MOV_LOG = 0, 1, 2
+
+
+def _field(game, name, default=None):
+    """Read a field from a dict/Series game or an itertuples row."""
+    if hasattr(game, 'get'):
+        return game.get(name, default)
+    return getattr(game, name, default)
+
+
+# Context columns with their fallback column and default value
+_CONTEXT_COLUMNS = {
+    'home_rest': (None, 2),
+    'away_rest': (None, 2),
+    'away_travel_dist': ('travel_distance', 0),
+    'home_injuries': ('injuries', 0),
+    'away_injuries': ('injuries', 0),
+}
+
+
+def _normalize_columns(games_df):
+    """
+    Return `games_df` with every context column present.
+
+    Missing columns are filled from their alias (`travel_distance`,
+    `injuries`) or a default, so rows can be read as `row.away_travel_dist`
+    etc. without per-game fallbacks.
+    """
+    missing = {}
+    for name, (alias, default) in _CONTEXT_COLUMNS.items():
+        if name in games_df.columns:
+            continue
+        if alias is not None and alias in games_df.columns:
+            missing[name] = games_df[alias]
+        else:
+            missing[name] = default
+    games_df = games_df.assign(**missing) if missing else games_df
+    if games_df['away_travel_dist'].hasnans:
+        games_df = games_df.assign(away_travel_dist=games_df['away_travel_dist'].fillna(0))
+    return games_df
+
+
+@njit(cache=True)
+def _run_elo(ratings, home_idx, away_idx, home_adj_add, away_adj_add, mov_mult,
+             home_actual, k_factor, out_home_rating, out_away_rating):
+    """
+    Apply the chronological rating updates in place.
+
+    Game N's ratings feed game N+1, so this loop cannot be vectorized;
+    it is JIT-compiled instead. Post-game ratings are written to the
+    `out_*` arrays.
+    """
+    for i in range(home_idx.shape[0]):
+        h = home_idx[i]
+        a = away_idx[i]
+        home_elo = ratings[h] + home_adj_add[i]
+        away_elo = ratings[a] + away_adj_add[i]
+        expected = 1.0 / (1.0 + math.exp(_LN10_400 * (away_elo - home_elo)))
+        delta = k_factor * mov_mult[i] * (home_actual[i] - expected)
+        ratings[h] += delta
+        ratings[a] -= delta
+        out_home_rating[i] = ratings[h]
+        out_away_rating[i] = ratings[a]
+
+
+@njit(cache=True)
+def _assign_waves(home_idx, away_idx, n_teams):
+    """
+    Group games into waves in which no team plays twice.
+
+    Each game goes one wave after the latest wave either of its teams
+    played in, so every team's games stay in chronological order.
+    """
+    last_wave = np.full(n_teams, -1, dtype=np.int64)
+    waves = np.empty(home_idx.shape[0], dtype=np.int64)
+    for i in range(home_idx.shape[0]):
+        h = home_idx[i]
+        a = away_idx[i]
+        w = max(last_wave[h], last_wave[a]) + 1
+        waves[i] = w
+        last_wave[h] = w
+        last_wave[a] = w
+    return waves
+
+
+def _run_elo_waves(ratings, home_idx, away_idx, home_adj_add, away_adj_add, mov_mult,
+                   home_actual, k_factor, out_home_rating, out_away_rating):
+    """
+    Same contract as `_run_elo`, but updates a whole wave of games at once.
+
+    Games within a wave share no teams, so their updates are independent
+    and can be applied as one NumPy gather/scatter. Results match the
+    game-by-game loop exactly.
+    """
+    waves = _assign_waves(home_idx, away_idx, ratings.shape[0])
+    order = np.argsort(waves, kind='stable')
+    bounds = np.searchsorted(waves[order], np.arange(waves.max(initial=-1) + 2))
+    for w in range(len(bounds) - 1):
+        games = order[bounds[w]:bounds[w + 1]]
+        h = home_idx[games]
+        a = away_idx[games]
+        home_elo = ratings[h] + home_adj_add[games]
+        away_elo = ratings[a] + away_adj_add[games]
+        expected = 1.0 / (1.0 + np.exp(_LN10_400 * (away_elo - home_elo)))
+        delta = k_factor * mov_mult[games] * (home_actual[games] - expected)
+        ratings[h] += delta
+        ratings[a] -= delta
+        out_home_rating[games] = ratings[h]
+        out_away_rating[games] = ratings[a]
+
+
+class EloModel:
+    """
+    ELO Rating System for Hockey Game Prediction.
+
+    Supports contextual adjustments for home advantage, rest,
+    travel fatigue, injuries, and margin of victory.
+    """
+
+    # No per-instance __dict__: grid searches build many models
+    __slots__ = (
+        'params',
+        # cached hyperparameters (see _refresh_params)
+        '_k', '_home_adv', '_initial', '_mov', '_mov_mode',
+        '_otw', '_rest_coef', '_b2b',
+        # team ratings
+        '_teams', '_team_id', '_rating_arr',
+        # rating history
+        '_hist_home_idx', '_hist_away_idx', '_hist_home_rating', '_hist_away_rating',
+    )
+
+    def __init__(self, params):
+        """
+        Initialize model with hyperparameters.
+
+        Parameters
+        ----------
+        params : dict
+            k_factor : float
+                Rating change rate (typical: 20-40)
+            home_advantage : float
+                Home ice boost in rating points (typical: 50-150)
+            initial_rating : float
+                Starting rating for all teams (default: 1500)
+            mov_multiplier : float
+                Margin of victory weight (0 = disabled)
+            mov_method : str
+                'linear' or 'logarithmic' scaling for margin
+            ot_win_multiplier : float
+                Actual score credited for an overtime win (default: 0.75)
+            rest_advantage_per_day : float
+                Rating boost per day of rest differential
+            b2b_penalty : float
+                Penalty for back-to-back games (rest <= 1 day)
+        """
+        self.params = params
+        self._refresh_params()
+
+        # Ratings live in an array indexed by team id; _teams maps id -> name
+        self._teams = pd.Index([])
+        self._team_id = {}
+        self._rating_arr = np.empty(0)
+
+        # Rating history stored column-wise in growable typed buffers;
+        # team columns index into _teams
+        self._hist_home_idx = array('q')
+        self._hist_away_idx = array('q')
+        self._hist_home_rating = array('d')
+        self._hist_away_rating = array('d')
+
+    def _refresh_params(self):
+        """Cache hyperparameters as attributes for the per-game hot paths."""
+        params = self.params
+        self._k = params.get('k_factor', 32)
+        self._home_adv = params.get('home_advantage', 0)
+        self._initial = params.get('initial_rating', 1500)
+        self._mov = params.get('mov_multiplier', 0)
+        self._otw = params.get('ot_win_multiplier', 0.75)
+        self._rest_coef = params.get('rest_advantage_per_day', 0)
+        self._b2b = params.get('b2b_penalty', 0)
+
+        # Pick the MOV formula once; a plain int keeps the model picklable
+        if self._mov == 0:
+            self._mov_mode = _MOV_OFF
+        elif params.get('mov_method', 'logarithmic') == 'linear':
+            self._mov_mode = _MOV_LINEAR
+        else:
+            self._mov_mode = _MOV_LOG
+
+    @property
+    def ratings(self):
+        """Snapshot of current ratings as a {team: rating} dict."""
+        return dict(zip(self._teams, self._rating_arr.tolist()))
+
+    @property
+    def rating_history(self):
+        """Post-game ratings as a list of dicts, one per game played."""
+        return self.get_rating_history_df().to_dict('records')
+
+    def initialize_ratings(self, teams, divisions=None):
+        """Initialize team ratings, optionally by division tier."""
+        initial = self._initial
+        division_ratings = {'D1': initial + 100, 'D2': initial, 'D3': initial - 100}
+
+        team_ids = self._register_teams(teams)
+        ratings = np.full(len(team_ids), initial, dtype=np.float64)
+        if divisions is not None:
+            # Positional access either way, decided once rather than per team
+            if hasattr(divisions, 'to_numpy'):
+                div_arr = divisions.to_numpy()
+            else:
+                div_arr = np.asarray(divisions, dtype=object)
+            n_div = min(len(div_arr), len(team_ids))
+            ratings[:n_div] = [division_ratings.get(div, initial) for div in div_arr[:n_div]]
+        self._rating_arr[team_ids] = ratings
+
+    def calculate_expected_score(self, team_elo, opponent_elo):
+        """Calculate expected win probability using ELO formula."""
+        return 1.0 / (1.0 + np.exp(_LN10_400 * (opponent_elo - team_elo)))
+
+    def calculate_mov_multiplier(self, goal_diff):
+        """Calculate margin of victory multiplier."""
+        mode = self._mov_mode
+        if mode == _MOV_LINEAR:
+            return 1 + abs(goal_diff) * self._mov
+        if mode == _MOV_LOG:
+            return 1 + math.log1p(abs(goal_diff)) * self._mov
+        return 1.0
+
+    def get_actual_score(self, outcome):
+        """Convert game outcome to actual score (0-1)."""
+        if outcome in ['RW', 'W', 1]:
+            return 1.0
+        elif outcome == 'OTW':
+            return self._otw
+        elif outcome == 'OTL':
+            return 1 - self._otw
+        return 0.0
+
+    def adjust_for_context(self, team_elo, is_home, rest_time, travel_dist, injuries):
+        """Apply contextual adjustments to ELO rating."""
+        if is_home:
+            return self._adjust_home(team_elo, rest_time, injuries)
+        return self._adjust_away(team_elo, rest_time, travel_dist, injuries)
+
+    def _adjust_home(self, team_elo, rest_time, injuries):
+        """Home-side adjustment: home advantage, back-to-back and injury penalties."""
+        return team_elo + self._home_adv - (rest_time <= 1) * self._b2b - injuries * 25
+
+    def _adjust_away(self, team_elo, rest_time, travel_dist, injuries):
+        """Away-side adjustment: back-to-back, travel (15 pts / 1000 mi) and injury penalties."""
+        # Kept as a guard, not max(travel_dist, 0): single games arrive
+        # un-normalized and max(nan, 0) is nan, whereas a missing travel
+        # distance has always meant no penalty
+        travel_penalty = (travel_dist / 1000) * 15 if travel_dist > 0 else 0
+        return team_elo - (rest_time <= 1) * self._b2b - travel_penalty - injuries * 25
+
+    def update_ratings(self, game):
+        """
+        Update team ratings after a game.
+
+        `game` may be a dict, a pandas Series, or an `itertuples` row.
+        """
+        home_id, away_id = self._register_teams(
+            [_field(game, 'home_team'), _field(game, 'away_team')]
+        )
+        home_elo = self._rating_arr[home_id]
+        away_elo = self._rating_arr[away_id]
+
+        home_expected = self._home_expected(home_elo, away_elo, *self._game_context(game))
+
+        home_goals = _field(game, 'home_goals')
+        away_goals = _field(game, 'away_goals')
+
+        # Handle different outcome column names
+        home_outcome = _field(game, 'home_outcome')
+        home_win = _field(game, 'home_win')
+        if home_outcome is not None:
+            home_actual = self.get_actual_score(home_outcome)
+        elif home_win is not None:
+            home_actual = 1.0 if home_win else 0.0
+        else:
+            home_actual = 1.0 if home_goals > away_goals else 0.0
+
+        goal_diff = home_goals - away_goals
+        mov_mult = self.calculate_mov_multiplier(goal_diff)
+
+        k = self._k * mov_mult
+        self._rating_arr[home_id] = home_elo + k * (home_actual - home_expected)
+        self._rating_arr[away_id] = away_elo + k * ((1 - home_actual) - (1 - home_expected))
+
+        self._hist_home_idx.append(home_id)
+        self._hist_away_idx.append(away_id)
+        self._hist_home_rating.append(self._rating_arr[home_id])
+        self._hist_away_rating.append(self._rating_arr[away_id])
+
+    def _game_context(self, game):
+        """Read (home_rest, away_rest, away_travel, home_injuries, away_injuries) with defaults."""
+        return tuple(
+            _field(game, name, default if alias is None else _field(game, alias, default))
+            for name, (alias, default) in _CONTEXT_COLUMNS.items()
+        )
+
+    def _home_expected(self, home_elo, away_elo, home_rest, away_rest, away_travel,
+                       home_injuries, away_injuries):
+        """Expected home score after contextual adjustments to both ratings."""
+        home_adj = self._adjust_home(home_elo, home_rest, home_injuries)
+        away_adj = self._adjust_away(away_elo, away_rest, away_travel, away_injuries)
+
+        rest_diff = home_rest - away_rest
+        home_adj += rest_diff * self._rest_coef
+
+        return self.calculate_expected_score(home_adj, away_adj)
+
+    def team_ids(self, teams):
+        """Resolve team names to integer ids for `predict` (-1 for unseen teams)."""
+        return self._team_codes(teams)
+
+    def predict(self, home_id, away_id, home_rest=2, away_rest=2, away_travel=0,
+                home_injuries=0, away_injuries=0):
+        """
+        Predict a matchup between teams given by integer id (see `team_ids`).
+
+        Returns (home_win_prob, home_goals, away_goals). An id of -1 uses
+        the default rating.
+        """
+        home_win_prob = self._home_expected(
+            self._rating_by_id(home_id), self._rating_by_id(away_id),
+            home_rest, away_rest, away_travel, home_injuries, away_injuries
+        )
+        expected_diff = (home_win_prob - 0.5) * 12
+
+        home_goals = 3.0 + (expected_diff / 2)
+        away_goals = 3.0 - (expected_diff / 2)
+        return home_win_prob, home_goals, away_goals
+
+    def _predict_pair(self, home_team, away_team, *context):
+        """Name-based wrapper around `predict`: resolves each team once."""
+        return self.predict(self._resolve(home_team), self._resolve(away_team), *context)
+
+    def predict_goals(self, game):
+        """
+        Predict goals for both teams.
+
+        `game` may be a dict, a pandas Series, or an `itertuples` row.
+        """
+        _, home_goals, away_goals = self._predict_pair(
+            _field(game, 'home_team'), _field(game, 'away_team'), *self._game_context(game)
+        )
+        return home_goals, away_goals
+
+    def predict_winner(self, game):
+        """
+        Predict the winner and the home win probability.
+
+        `game` may be a dict, a pandas Series, or an `itertuples` row.
+        """
+        home_team = _field(game, 'home_team')
+        away_team = _field(game, 'away_team')
+        home_win_prob, _, _ = self._predict_pair(home_team, away_team, *self._game_context(game))
+        return (home_team if home_win_prob >= 0.5 else away_team), home_win_prob
+
+    def fit(self, games_df, waves=False):
+        """
+        Train the model on historical games.
+
+        With `waves=True`, games are grouped into waves of team-disjoint
+        games and each wave is updated in one vectorized step. Results are
+        identical; this mainly helps large leagues when numba is unavailable.
+        """
+        teams = pd.unique(np.concatenate([
+            games_df['home_team'].to_numpy(), games_df['away_team'].to_numpy()
+        ]))
+
+        if 'division' in games_df.columns:
+            # Home teams in order of first appearance, so divisions line up with `teams`
+            divisions = games_df.drop_duplicates('home_team').set_index('home_team')['division']
+            self.initialize_ratings(teams, divisions)
+        else:
+            self.initialize_ratings(teams)
+
+        arrs = self._prepare_arrays(games_df)
+
+        n_games = len(games_df)
+        home_rating = np.empty(n_games)
+        away_rating = np.empty(n_games)
+        if waves:
+            run_elo = _run_elo_waves
+        else:
+            run_elo = _run_elo_cfast or _run_elo
+        run_elo(
+            self._rating_arr, arrs['home_idx'], arrs['away_idx'],
+            arrs['home_adj_add'], arrs['away_adj_add'], arrs['mov_mult'],
+            arrs['home_actual'], float(self._k),
+            home_rating, away_rating
+        )
+
+        self._record_history(arrs['home_idx'], arrs['away_idx'], home_rating, away_rating)
+
+    def _register_teams(self, teams):
+        """Return ids for `teams`, adding unseen teams at the default rating."""
+        new_teams = [team for team in dict.fromkeys(teams) if team not in self._team_id]
+        if new_teams:
+            start = len(self._teams)
+            self._team_id.update((team, start + i) for i, team in enumerate(new_teams))
+            self._teams = self._teams.append(pd.Index(new_teams, dtype=object))
+            self._rating_arr = np.concatenate([self._rating_arr, np.full(len(new_teams), 1500.0)])
+        return [self._team_id[team] for team in teams]
+
+    def _team_codes(self, teams):
+        """
+        Map a column of team names to ids in one vectorized lookup (-1 if unseen).
+
+        Codes are int16 for up to 32767 teams (int32 beyond), which keeps
+        index arrays small and gives the JIT kernel a stable dtype.
+        """
+        codes = self._teams.get_indexer(np.asarray(teams, dtype=object))
+        return codes.astype(np.int16 if len(self._teams) < 2 ** 15 else np.int32)
+
+    def _resolve(self, team):
+        """Id of `team`, or -1 if it is unseen."""
+        return self._team_id.get(team, -1)
+
+    def _rating_by_id(self, team_id):
+        """Current rating for `team_id`, or the default rating for -1."""
+        return self._rating_arr[team_id] if team_id >= 0 else 1500
+
+    def _record_history(self, home_idx, away_idx, home_rating, away_rating):
+        """Append post-game ratings to the column-wise history."""
+        self._hist_home_idx.frombytes(np.asarray(home_idx, dtype=np.int64).tobytes())
+        self._hist_away_idx.frombytes(np.asarray(away_idx, dtype=np.int64).tobytes())
+        self._hist_home_rating.frombytes(np.asarray(home_rating, dtype=np.float64).tobytes())
+        self._hist_away_rating.frombytes(np.asarray(away_rating, dtype=np.float64).tobytes())
+
+    def get_rating_history_df(self):
+        """Return the rating history as a DataFrame, one row per game."""
+        # Copy out of the buffers: a live view would block further appends
+        return pd.DataFrame({
+            'home_team': self._teams[np.array(self._hist_home_idx, dtype=np.int64)],
+            'away_team': self._teams[np.array(self._hist_away_idx, dtype=np.int64)],
+            'home_rating': np.array(self._hist_home_rating, dtype=np.float64),
+            'away_rating': np.array(self._hist_away_rating, dtype=np.float64)
+        })
+
+    def _prepare_arrays(self, games_df, with_results=True):
+        """
+        Precompute per-game inputs of the rating update as NumPy arrays.
+
+        Everything except the rating state itself is computed here in
+        vectorized form: team indices into `self._teams` (-1 for unseen
+        teams), the contextual ELO adjustments for each side and, when
+        `with_results` is set, the MOV multiplier and the actual home score.
+        """
+        games_df = _normalize_columns(games_df)
+        home_rest = games_df['home_rest'].to_numpy(dtype=np.float64)
+        away_rest = games_df['away_rest'].to_numpy(dtype=np.float64)
+        away_travel = games_df['away_travel_dist'].to_numpy(dtype=np.float64)
+        home_inj = games_df['home_injuries'].to_numpy(dtype=np.float64)
+        away_inj = games_df['away_injuries'].to_numpy(dtype=np.float64)
+
+        home_adv = self._home_adv
+        b2b = self._b2b
+        rest_coef = self._rest_coef
+
+        home_adj_add = (
+            home_adv
+            - (home_rest <= 1) * b2b
+            - home_inj * 25
+            + (home_rest - away_rest) * rest_coef
+        )
+        away_adj_add = -(
+            (away_rest <= 1) * b2b
+            + np.maximum(away_travel, 0) / 1000 * 15
+            + away_inj * 25
+        )
+
+        arrs = {
+            'home_idx': self._team_codes(games_df['home_team']),
+            'away_idx': self._team_codes(games_df['away_team']),
+            'home_rest': home_rest,
+            'away_rest': away_rest,
+            'away_travel': away_travel,
+            'home_inj': home_inj,
+            'away_inj': away_inj,
+            'home_adj_add': home_adj_add,
+            'away_adj_add': away_adj_add,
+        }
+        if not with_results:
+            return arrs
+
+        home_goals = games_df['home_goals'].to_numpy(dtype=np.float64)
+        away_goals = games_df['away_goals'].to_numpy(dtype=np.float64)
+        goal_diff = home_goals - away_goals
+
+        mode = self._mov_mode
+        if mode == _MOV_LINEAR:
+            mov_mult = 1 + np.abs(goal_diff) * self._mov
+        elif mode == _MOV_LOG:
+            mov_mult = 1 + np.log1p(np.abs(goal_diff)) * self._mov
+        else:
+            mov_mult = np.ones(len(goal_diff))
+
+        if 'home_outcome' in games_df.columns:
+            outcome_scores = {'RW': 1.0, 'W': 1.0, 1: 1.0, 'OTW': self._otw, 'OTL': 1 - self._otw}
+            home_actual = (
+                games_df['home_outcome'].map(outcome_scores).fillna(0.0).to_numpy(dtype=np.float64)
+            )
+        elif 'home_win' in games_df.columns:
+            home_actual = games_df['home_win'].to_numpy(dtype=bool).astype(np.float64)
+        else:
+            home_actual = (home_goals > away_goals).astype(np.float64)
+
+        arrs.update(goal_diff=goal_diff, home_actual=home_actual, mov_mult=mov_mult)
+        return arrs
+
+    def predict_batch(self, games_df):
+        """
+        Predict goals for every game in `games_df` in one vectorized pass.
+
+        Uses current ratings (no updates between games). Returns
+        (home_goals, away_goals) as NumPy arrays.
+        """
+        arrs = self._prepare_arrays(games_df, with_results=False)
+
+        # Unseen teams have index -1, which picks the trailing default rating
+        ratings = np.append(self._rating_arr, 1500.0)
+        home_adj = ratings[arrs['home_idx']] + arrs['home_adj_add']
+        away_adj = ratings[arrs['away_idx']] + arrs['away_adj_add']
+
+        home_win_prob = 1.0 / (1.0 + np.exp(_LN10_400 * (away_adj - home_adj)))
+        expected_diff = (home_win_prob - 0.5) * 12
+        return 3.0 + (expected_diff / 2), 3.0 - (expected_diff / 2)
+
+    def evaluate(self, games_df):
+        """Evaluate model on test set."""
+        predictions, _ = self.predict_batch(games_df)
+        actuals = games_df['home_goals'].to_numpy(dtype=np.float64)
+
+        # Plain NumPy: same formulas as sklearn's metrics without input validation
+        residuals = actuals - predictions
+        ss_res = np.dot(residuals, residuals)
+        rmse = np.sqrt(ss_res / len(actuals))
+        mae = np.mean(np.abs(residuals))
+        if np.ptp(actuals) > 0:
+            centered = actuals - actuals.mean()
+            r2 = 1 - ss_res / np.dot(centered, centered)
+        else:
+            r2 = 0.0
+        return {'rmse': rmse, 'mae': mae, 'r2': r2}
+
+    def get_rankings(self, top_n=None):
+        """Get team rankings sorted by ELO rating."""
+        order = np.argsort(-self._rating_arr, kind='stable')
+        sorted_ratings = list(zip(self._teams[order].tolist(), self._rating_arr[order].tolist()))
+        return sorted_ratings[:top_n] if top_n else sorted_ratings